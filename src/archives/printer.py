@@ -1,22 +1,46 @@
 import serial
 import argparse
+import sys
+import time
 
-def read_raw_serial(port, baud_rate):
+HEX_FLUSH_INTERVAL = 0.1  # seconds between hex dump lines
+
+def read_raw_serial(port, baud_rate, hex_dump=False):
     try:
         with serial.Serial(port, baud_rate, timeout=1) as ser:
-            print(f"Connected to {port} at {baud_rate} baud.")
-            while True:
-                if ser.in_waiting:
-                    data = ser.read(ser.in_waiting)
-                    if data:
-                        print("RAW:", data.hex(" "))
+            # Status goes to stderr so a capture of stdout is pure serial data
+            print(f"Connected to {port} at {baud_rate} baud.", file=sys.stderr)
+            out = sys.stdout.buffer
+            chunks = []
+            last_flush = time.monotonic()
+            try:
+                while True:
+                    if ser.in_waiting:
+                        data = ser.read(ser.in_waiting)
+                        if data and not hex_dump:
+                            # Straight pass-through, no formatting
+                            out.write(data)
+                            out.flush()
+                        elif data:
+                            chunks.append(data)
+
+                    # Batch reads so the hex formatting runs once per interval, not per chunk
+                    if chunks and time.monotonic() - last_flush >= HEX_FLUSH_INTERVAL:
+                        print("RAW:", b"".join(chunks).hex(" "))
+                        chunks.clear()
+                        last_flush = time.monotonic()
+            finally:
+                # Don't lose the partial batch on Ctrl+C or a serial error
+                if chunks:
+                    print("RAW:", b"".join(chunks).hex(" "))
     except serial.SerialException as e:
-        print(f"Serial connection error: {e}")
+        print(f"Serial connection error: {e}", file=sys.stderr)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Raw Serial Dump")
     parser.add_argument("-p", "--port", default="COM3", help="Serial port (default: COM3)")
     parser.add_argument("-b", "--baud", type=int, default=416666, help="Baud rate (default: 416666)")
+    parser.add_argument("-x", "--hex", action="store_true", help="Print space-separated hex instead of raw bytes")
     args = parser.parse_args()
 
-    read_raw_serial(args.port, args.baud)
+    read_raw_serial(args.port, args.baud, args.hex)
@@ -1,11 +1,27 @@
 import serial
 import struct
 import argparse
+import logging
+import sys
+import threading
+
+log = logging.getLogger("crsf")
 
 CRSF_SYNC = 0xC8
 CRSF_MAX_PACKET_SIZE = 64
 CRSF_MIN_PACKET_SIZE = 4
 
+# Payload layouts, offsets taken from the start of the packet (payload starts at 3)
+_LINK_STATS = struct.Struct(">BBBb")  # uplink rssi 1/2, lq, snr
+_U16_BE = struct.Struct(">H")
+_GPS = struct.Struct(">iiHxxHB")  # lat, lon, speed, (heading), alt, sats
+
+# Field scales as multipliers; CPython doesn't turn the divides into these itself.
+# Lat/lon stay divides (by 1e7): multiplying by 1e-7 isn't exact and shifts the
+# printed 6th decimal for a few percent of coordinates
+_MPS_PER_UNIT = 1.0 / 36.0  # speed in km/h * 10
+_VOLTS_PER_UNIT = 0.1  # battery in decivolts
+
 def crc8_dvb_s2(crc, byte):
     crc ^= byte
     for _ in range(8):
@@ -15,85 +31,238 @@ def crc8_dvb_s2(crc, byte):
             crc = crc << 1
     return crc & 0xFF
 
+# crc8_dvb_s2(crc, byte) == CRC8_DVB_S2_TABLE[crc ^ byte], so the bit loop only runs at import
+CRC8_DVB_S2_TABLE = bytes(crc8_dvb_s2(0, i) for i in range(256))
+
 def crc8_check(packet):
     crc = 0
+    table = CRC8_DVB_S2_TABLE
     for byte in packet[2:-1]:  # skip sync and length
-        crc = crc8_dvb_s2(crc, byte)
+        crc = table[crc ^ byte]
     return crc == packet[-1]
 
+# Handlers take the whole packet; payload runs from offset 3 up to the CRC byte
+def _parse_link_stats(packet):
+    if len(packet) - 4 >= _LINK_STATS.size:
+        rssi1, rssi2, lq, snr = _LINK_STATS.unpack_from(packet, 3)
+        log.info("Link Stats - RSSI: %d/%d, LQ: %d, SNR: %d", rssi1, rssi2, lq, snr)
+
+def _parse_battery(packet):
+    if len(packet) - 4 >= _U16_BE.size:
+        voltage = _U16_BE.unpack_from(packet, 3)[0] * _VOLTS_PER_UNIT
+        log.info("Battery Voltage: %.1fV", voltage)
+
+def _parse_gps(packet):
+    if len(packet) - 4 >= _GPS.size:
+        lat, lon, speed, alt, sats = _GPS.unpack_from(packet, 3)
+        lat /= 1e7
+        lon /= 1e7
+        speed *= _MPS_PER_UNIT
+        alt -= 1000
+        log.info("GPS: %.6f, %.6f, Alt: %dm, Speed: %.1fm/s, Sats: %d", lat, lon, alt, speed, sats)
+
+def _parse_unknown(packet):
+    if log.isEnabledFor(logging.INFO):
+        log.info("Unknown Packet Type: 0x%02X | Payload: %s", packet[2], packet[3:-1].hex())
+
+# Indexed by packet type byte
+_HANDLERS = [_parse_unknown] * 256
+_HANDLERS[0x14] = _parse_link_stats  # LINK_STATISTICS
+_HANDLERS[0x08] = _parse_battery  # BATTERY_SENSOR
+_HANDLERS[0x02] = _parse_gps  # GPS
+
+# Expects a framed packet from RingBuffer.frame (sync byte, sane length, at least
+# CRSF_MIN_PACKET_SIZE bytes); use parse_crsf_packet_safe for arbitrary bytes
 def parse_crsf_packet(packet):
     is_valid = crc8_check(packet)
-    print(f"\nRaw Packet: {packet.hex(' ')} | CRC: {'OK' if is_valid else 'FAIL'}")
+    if log.isEnabledFor(logging.DEBUG):  # skip the hex dump entirely unless it will be shown
+        log.debug("Raw Packet: %s | CRC: %s", packet.hex(' '), 'OK' if is_valid else 'FAIL')
 
-    if not is_valid or len(packet) < 4:
+    if not is_valid:
+        log.warning("CRC FAIL: type 0x%02X, %d bytes", packet[2], len(packet))
         return
 
-    packet_type = packet[2]
-    payload = packet[3:-1]
-
-    if packet_type == 0x14:  # LINK_STATISTICS
-        if len(payload) >= 4:
-            rssi1, rssi2, lq = payload[0], payload[1], payload[2]
-            snr = struct.unpack("b", bytes([payload[3]]))[0]
-            print(f"Link Stats - RSSI: {rssi1}/{rssi2}, LQ: {lq}, SNR: {snr}")
-    elif packet_type == 0x08:  # BATTERY_SENSOR
-        if len(payload) >= 2:
-            voltage = struct.unpack(">H", payload[0:2])[0] / 10.0
-            print(f"Battery Voltage: {voltage:.1f}V")
-    elif packet_type == 0x02:  # GPS
-        if len(payload) >= 15:
-            lat = struct.unpack(">i", payload[0:4])[0] / 1e7
-            lon = struct.unpack(">i", payload[4:8])[0] / 1e7
-            speed = struct.unpack(">H", payload[8:10])[0] / 36.0
-            alt = struct.unpack(">H", payload[12:14])[0] - 1000
-            sats = payload[14]
-            print(f"GPS: {lat:.6f}, {lon:.6f}, Alt: {alt}m, Speed: {speed:.1f}m/s, Sats: {sats}")
-    else:
-        print(f"Unknown Packet Type: 0x{packet_type:02X} | Payload: {payload.hex()}")
+    _HANDLERS[packet[2]](packet)
 
-def read_crsf_serial(port, baud_rate):
+def parse_crsf_packet_safe(packet):
+    if len(packet) < CRSF_MIN_PACKET_SIZE or packet[0] != CRSF_SYNC or packet[1] + 2 != len(packet):
+        log.warning("Not a framed CRSF packet: %s", bytes(packet).hex(' '))
+        return
+    parse_crsf_packet(packet)
+
+class RingBuffer:
+    # Fixed-size byte ring; head/tail only ever grow and are masked on access,
+    # so consuming a packet is an index bump instead of reslicing the buffer.
+    # Safe for one producer (readinto, moves tail) and one consumer (frame,
+    # moves head) on separate threads: each index has a single writer
+    def __init__(self, size=4096):
+        assert size & (size - 1) == 0, "size must be a power of two"
+        self._buf = bytearray(size)
+        self._size = size
+        self._mask = size - 1
+        self._head = 0
+        self._tail = 0
+        self._scratch = bytearray(CRSF_MAX_PACKET_SIZE)
+
+    def free(self):
+        return self._size - (self._tail - self._head)
+
+    def readinto(self, stream, n):
+        # Read up to n bytes from stream into the free space, in two parts if it
+        # wraps; anything that doesn't fit stays in the OS buffer. pyserial's
+        # readinto is read() plus a copy, so this bounds the read to the free
+        # space rather than saving an allocation
+        n = min(n, self.free())
+        if n <= 0:
+            return 0
+        start = self._tail & self._mask
+        first = min(n, self._size - start)
+        view = memoryview(self._buf)
+        got = stream.readinto(view[start:start + first])
+        if got == first and n > first:
+            got += stream.readinto(view[:n - first])
+        self._tail += got
+        return got
+
+    def frame(self, parse):
+        # Hand every complete CRSF packet to parse and consume it. Works on local
+        # copies of the indices and publishes head once, so the per-packet path is
+        # plain int arithmetic and bytearray indexing
+        buf, mask, size = self._buf, self._mask, self._size
+        head, tail = self._head, self._tail
+        bufview = memoryview(buf)
+
+        # Resync on valid CRSF packets
+        while tail - head >= 2:
+            # Back-to-back packets leave the head on a sync byte, so only scan after junk
+            if buf[head & mask] != CRSF_SYNC:
+                sync_pos = self._find(CRSF_SYNC, head, tail)
+                if sync_pos == -1:
+                    head = tail
+                    break
+                head = sync_pos
+
+                if tail - head < 2:
+                    break
+
+            length = buf[(head + 1) & mask]
+            expected_len = length + 2  # sync + len + payload + crc
+
+            if length < 2 or expected_len > CRSF_MAX_PACKET_SIZE:
+                head += 1
+                continue
+
+            if tail - head < expected_len:
+                break  # wait for more bytes
+
+            i = head & mask
+            if i + expected_len <= size:
+                parse(bufview[i:i + expected_len])
+            else:
+                parse(self._view(head, expected_len))  # wraps past the end, copied once
+            head += expected_len
+
+        # Published last: once head moves, the reader may reuse those bytes
+        self._head = head
+
+    def _find(self, byte, start, end):
+        # Position of the first byte in [start, end), or -1; positions are unmasked
+        i = start & self._mask
+        j = i + (end - start)
+        found = self._buf.find(byte, i, min(j, self._size))
+        if found != -1:
+            return start + found - i
+        if j > self._size:
+            found = self._buf.find(byte, 0, j - self._size)
+            if found != -1:
+                return start + found + self._size - i
+        return -1
+
+    def _view(self, start, n):
+        # View of n bytes from position start, copied into scratch since they wrap
+        i = start & self._mask
+        first = self._size - i
+        self._scratch[:first] = self._buf[i:]
+        self._scratch[first:n] = self._buf[:n - first]
+        return memoryview(self._scratch)[:n]
+
+def _read_serial_into(ser, ring, data_ready, space_freed, stop, errors):
+    # Producer thread: sits in the blocking serial read (GIL released) and only moves the ring's tail
+    # Bound once up front; these run for every wakeup
+    readinto = ring.readinto
+    free = ring.free
+    in_waiting = type(ser).in_waiting.fget
+    stopped = stop.is_set
+    notify = data_ready.set
     try:
-        with serial.Serial(port, baud_rate, timeout=1) as ser:
-            print(f"Connected to {port} at {baud_rate} baud.")
-            buffer = bytearray()
-
-            while True:
-                if ser.in_waiting:
-                    buffer.extend(ser.read(ser.in_waiting))
-
-                # Resync on valid CRSF packets
-                while len(buffer) >= 2:
-                    sync_index = buffer.find(CRSF_SYNC)
-                    if sync_index == -1:
-                        buffer.clear()
-                        break
-                    if sync_index > 0:
-                        buffer = buffer[sync_index:]
+        while not stopped():
+            if not free():
+                # Ring is full: sleep until the parser moves head rather than
+                # spinning on zero-length reads. Clear before rechecking so a
+                # set() from the parser in between isn't lost
+                space_freed.clear()
+                if not free():
+                    space_freed.wait(1)  # timed so a stop request is still seen
+                continue
 
-                    if len(buffer) < 2:
-                        break
+            # Block for the first byte, then drain whatever else the OS has already buffered
+            if not readinto(ser, 1):
+                continue  # timed out with the link idle
+            waiting = in_waiting(ser)
+            if waiting:
+                readinto(ser, waiting)
+            notify()
+    except Exception as e:  # not just SerialException, so driver errors reach the main thread too
+        errors.append(e)
+    finally:
+        stop.set()
+        data_ready.set()
 
-                    length = buffer[1]
-                    expected_len = length + 2  # sync + len + payload + crc
+def read_crsf_serial(port, baud_rate):
+    try:
+        with serial.Serial(port, baud_rate, timeout=1) as ser:
+            log.info("Connected to %s at %d baud.", port, baud_rate)
+            ring = RingBuffer()
+            data_ready = threading.Event()
+            space_freed = threading.Event()
+            stop = threading.Event()
+            errors = []
+            reader = threading.Thread(
+                target=_read_serial_into,
+                args=(ser, ring, data_ready, space_freed, stop, errors),
+                daemon=True,
+            )
+            reader.start()
 
-                    if length < 2 or expected_len > CRSF_MAX_PACKET_SIZE:
-                        buffer.pop(0)
+            try:
+                while True:
+                    # Timed wait so Ctrl+C still gets through on Windows
+                    if not data_ready.wait(1):
                         continue
+                    data_ready.clear()
+                    done = stop.is_set()  # checked first so the reader's last bytes still get parsed
+                    ring.frame(parse_crsf_packet)
+                    space_freed.set()
+                    if done:
+                        break
+            finally:
+                stop.set()
+                space_freed.set()
+                reader.join()
 
-                    if len(buffer) < expected_len:
-                        break  # wait for more bytes
-
-                    packet = buffer[:expected_len]
-                    buffer = buffer[expected_len:]
-                    parse_crsf_packet(packet)
+            if errors:
+                raise errors[0]
 
     except serial.SerialException as e:
-        print(f"Serial connection error: {e}")
+        log.error("Serial connection error: %s", e)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="CRSF Telemetry Parser")
     parser.add_argument("-p", "--port", default="COM3", help="Serial port (default: COM3)")
     parser.add_argument("-b", "--baud", type=int, default=420000, help="Baud rate (default: 420000)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Also dump every raw packet")
     args = parser.parse_args()
 
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format="%(message)s", stream=sys.stdout)
+
     read_crsf_serial(args.port, args.baud)